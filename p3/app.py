@@ -1,9 +1,18 @@
 import streamlit as st
 import os
-from collections import defaultdict
-from transformers import pipeline, AutoTokenizer
+from collections import Counter, OrderedDict, defaultdict
+from transformers import (
+    pipeline, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+)
 import PyPDF2
 import io
+import hashlib
+import html
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 # Page config
 st.set_page_config(
@@ -45,6 +54,10 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "pdf_text" not in st.session_state:
     st.session_state.pdf_text = ""
+if "pdf_pages" not in st.session_state:
+    st.session_state.pdf_pages = []
+if "analysis_jobs" not in st.session_state:
+    st.session_state.analysis_jobs = []
 
 # Header
 st.title("🤖 AI Code & Document Analyzer")
@@ -57,6 +70,21 @@ st.markdown(f"""
 # Code Summarizer Functions
 FILE_EXTS = {".py", ".sql", ".yml", ".yaml", ".xml", ".conf", ".ini", ".txt"}
 MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+QA_MODEL_NAME = "distilbert-base-cased-distilled-squad"
+
+# PDF chat answering engines
+ENGINE_SUMMARIZER = "Summarizer (generative)"
+ENGINE_EXTRACTIVE = "Extractive QA (fast)"
+ANSWER_ENGINES = [ENGINE_EXTRACTIVE, ENGINE_SUMMARIZER]
+
+# Generation settings for the summarizer engine, fastest first. Beam search
+# cannot be streamed token by token, so the quality tier renders all at once.
+GENERATION_TIERS = {
+    "⚡ Fast": {"num_beams": 1, "max_new_tokens": 64, "min_length": 0},
+    "⚖️ Balanced": {"num_beams": 1, "max_new_tokens": 142, "min_length": 0, "no_repeat_ngram_size": 3},
+    "🎯 Quality": {"num_beams": 4, "max_new_tokens": 142, "min_length": 56, "no_repeat_ngram_size": 3, "length_penalty": 2.0},
+}
+DEFAULT_TIER = "⚖️ Balanced"
 
 @st.cache_resource
 def load_summarizer():
@@ -68,6 +96,14 @@ def load_summarizer():
         st.error(f"Error loading model: {e}")
         return None, None
 
+@st.cache_resource
+def load_qa_model():
+    try:
+        return pipeline("question-answering", model=QA_MODEL_NAME, device=-1)
+    except Exception as e:
+        st.error(f"Error loading QA model: {e}")
+        return None
+
 def read_file(path):
     try:
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
@@ -101,7 +137,7 @@ def chunk_text(text, tokenizer, max_tokens=1020):
         start = end
     return chunks
 
-def summarize_content(content, summarizer, tokenizer):
+def summarize_content(content, summarizer, tokenizer, check_cancel=None):
     if not content.strip():
         return "File is empty or unreadable."
     
@@ -109,6 +145,8 @@ def summarize_content(content, summarizer, tokenizer):
     summaries = []
     
     for chunk in chunks:
+        if check_cancel:
+            check_cancel()
         try:
             result = summarizer(chunk)
             summaries.append(result[0]['summary_text'])
@@ -144,22 +182,16 @@ def create_consolidated_summary(file_counts, individual_summaries):
     else:
         return individual_summaries
 
-def summarize_files(directory):
-    summarizer, tokenizer = load_summarizer()
-    if not summarizer:
-        return "Error: Could not load AI model."
-    
+def summarize_files(directory, summarizer, tokenizer, progress=None):
     files, file_counts = get_files_in_directory(directory)
     summary_lines = []
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
     for i, file_path in enumerate(files):
         file_name = os.path.relpath(file_path, directory)
-        status_text.text(f"Processing: {file_name}")
+        if progress:
+            progress(i / len(files), f"Processing: {file_name}")
         
-        summary = summarize_content(read_file(file_path), summarizer, tokenizer)
+        summary = summarize_content(read_file(file_path), summarizer, tokenizer, progress)
         
         ext = os.path.splitext(file_name)[-1].lower()
         if ext == ".sql":
@@ -172,12 +204,10 @@ def summarize_files(directory):
             summary_lines.append(f"**{file_name}** (XML): {summary}")
         else:
             summary_lines.append(f"**{file_name}**: {summary}")
-        
-        progress_bar.progress((i + 1) / len(files))
     
-    status_text.text("Analysis complete!")
-    progress_bar.empty()
-    status_text.empty()
+    if progress:
+        # Honour a cancel that arrived during the last file
+        progress(1.0, "Consolidating summaries...")
     
     if not summary_lines:
         return "No supported files found in the directory."
@@ -185,48 +215,40 @@ def summarize_files(directory):
     individual_summaries = "\n\n".join(summary_lines)
     return create_consolidated_summary(file_counts, individual_summaries)
 
-def summarize_uploaded_files(uploaded_files):
-    summarizer, tokenizer = load_summarizer()
-    if not summarizer:
-        return "Error: Could not load AI model."
-    
+def summarize_uploaded_files(uploaded_files, summarizer, tokenizer, progress=None):
+    """Summarize uploaded files given as (name, raw bytes) pairs."""
     summary_lines = []
     file_counts = defaultdict(int)
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for i, file in enumerate(uploaded_files):
-        status_text.text(f"Processing: {file.name}")
+    for i, (file_name, data) in enumerate(uploaded_files):
+        if progress:
+            progress(i / len(uploaded_files), f"Processing: {file_name}")
         
         try:
-            content = file.read().decode("utf-8", errors="ignore")
-            file.seek(0)
+            content = data.decode("utf-8", errors="ignore")
         except Exception as e:
-            summary_lines.append(f"**{file.name}**: Error reading file: {e}")
+            summary_lines.append(f"**{file_name}**: Error reading file: {e}")
             continue
         
-        ext = os.path.splitext(file.name)[-1].lower()
+        ext = os.path.splitext(file_name)[-1].lower()
         file_counts[ext] += 1
         
-        summary = summarize_content(content, summarizer, tokenizer)
+        summary = summarize_content(content, summarizer, tokenizer, progress)
         
         if ext == ".sql":
-            summary_lines.append(f"**{file.name}** (SQL): {summary}")
+            summary_lines.append(f"**{file_name}** (SQL): {summary}")
         elif ext == ".py":
-            summary_lines.append(f"**{file.name}** (Python): {summary}")
+            summary_lines.append(f"**{file_name}** (Python): {summary}")
         elif ext in [".yml", ".yaml"]:
-            summary_lines.append(f"**{file.name}** (YAML): {summary}")
+            summary_lines.append(f"**{file_name}** (YAML): {summary}")
         elif ext == ".xml":
-            summary_lines.append(f"**{file.name}** (XML): {summary}")
+            summary_lines.append(f"**{file_name}** (XML): {summary}")
         else:
-            summary_lines.append(f"**{file.name}**: {summary}")
-        
-        progress_bar.progress((i + 1) / len(uploaded_files))
+            summary_lines.append(f"**{file_name}**: {summary}")
     
-    status_text.text("Analysis complete!")
-    progress_bar.empty()
-    status_text.empty()
+    if progress:
+        # Honour a cancel that arrived during the last file
+        progress(1.0, "Consolidating summaries...")
     
     if not summary_lines:
         return "No uploaded files to summarize."
@@ -234,27 +256,264 @@ def summarize_uploaded_files(uploaded_files):
     individual_summaries = "\n\n".join(summary_lines)
     return create_consolidated_summary(file_counts, individual_summaries)
 
+# Background Analysis Jobs
+ANALYSIS_WORKERS = 2
+ANALYSIS_JOB_TTL = 60 * 60  # seconds a finished job's result is kept
+ANALYSIS_POLL_SECONDS = 1.0
+
+class AnalysisCancelled(Exception):
+    pass
+
+class AnalysisJob:
+    def __init__(self, label):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.label = label
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.progress = 0.0
+        self.message = "Waiting for a free worker..."
+        self.result = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+    
+    def report(self, fraction=None, message=None):
+        """Progress callback for the summarizers; stops the job once cancelled.
+        
+        Called with no arguments it only checks for cancellation.
+        """
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled()
+        if fraction is not None:
+            self.progress = fraction
+        if message is not None:
+            self.message = message
+    
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+class AnalysisJobQueue:
+    """Bounded pool of model workers shared by all sessions.
+    
+    Jobs outlive the script run that submitted them, so sessions keep only
+    job IDs and poll here for progress and results.
+    """
+    
+    def __init__(self, max_workers=ANALYSIS_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.worker_state = threading.local()
+    
+    def submit(self, label, fn, source, summarizer):
+        """Queue fn(source, summarizer, tokenizer, progress=...) on the pool."""
+        job = AnalysisJob(label)
+        with self.lock:
+            self.prune()
+            self.jobs[job.job_id] = job
+        job.future = self.executor.submit(self.run, job, fn, source, summarizer)
+        return job.job_id
+    
+    def worker_models(self, summarizer):
+        """Pipeline and tokenizer private to the calling worker thread.
+        
+        Fast tokenizers are not thread-safe, so each worker wraps the shared
+        model weights with its own tokenizer instead of sharing one.
+        """
+        state = self.worker_state
+        if getattr(state, "model", None) is not summarizer.model:
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            state.model = summarizer.model
+            state.models = (
+                pipeline("summarization", model=summarizer.model, tokenizer=tokenizer, device=-1),
+                tokenizer,
+            )
+        return state.models
+    
+    def run(self, job, fn, source, summarizer):
+        job.status = "running"
+        try:
+            worker_summarizer, worker_tokenizer = self.worker_models(summarizer)
+            job.result = fn(source, worker_summarizer, worker_tokenizer, progress=job.report)
+            job.progress = 1.0
+            job.message = "Analysis complete!"
+            job.status = "done"
+        except AnalysisCancelled:
+            job.message = "Cancelled."
+            job.status = "cancelled"
+        except Exception as e:
+            job.result = f"Error: {e}"
+            job.message = "Analysis failed."
+            job.status = "failed"
+        finally:
+            job.finished_at = time.monotonic()
+    
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if not job or job.finished:
+            return
+        job.cancel_event.set()
+        if job.future and job.future.cancel():
+            # Never started, so run() will not update it
+            job.message = "Cancelled."
+            job.status = "cancelled"
+            job.finished_at = time.monotonic()
+    
+    def prune(self):
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at and now - job.finished_at > ANALYSIS_JOB_TTL
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+@st.cache_resource
+def get_analysis_queue():
+    return AnalysisJobQueue()
+
+def session_analysis_jobs():
+    queue = get_analysis_queue()
+    jobs = [queue.get(job_id) for job_id in st.session_state.analysis_jobs]
+    jobs = [job for job in jobs if job]
+    # Forget IDs of jobs the queue has already pruned
+    st.session_state.analysis_jobs = [job.job_id for job in jobs]
+    return jobs
+
+def render_analysis_jobs():
+    """Show this session's jobs, polling only while some are unfinished."""
+    polling = any(not job.finished for job in session_analysis_jobs())
+    run_every = ANALYSIS_POLL_SECONDS if polling else None
+    st.fragment(run_every=run_every)(analysis_jobs_panel)(polling)
+
+def analysis_jobs_panel(polling):
+    queue = get_analysis_queue()
+    jobs = session_analysis_jobs()
+    if polling and all(job.finished for job in jobs):
+        # Rerun the whole app to replace this polling fragment with a static one
+        st.rerun()
+    if not jobs:
+        return
+    
+    st.markdown("## 📊 Analysis Results")
+    if any(job.finished for job in jobs) and st.button("🧹 Clear finished jobs"):
+        st.session_state.analysis_jobs = [job.job_id for job in jobs if not job.finished]
+        st.rerun()
+    
+    for job in reversed(jobs):
+        st.markdown(f"**{job.label}** · job `{job.job_id}` · {job.status}")
+        if job.finished:
+            if job.result:
+                st.markdown(job.result)
+            else:
+                st.info(job.message)
+            continue
+        
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.progress(job.progress, text=job.message)
+        with col2:
+            if st.button("⏹️ Cancel", key=f"cancel_{job.job_id}"):
+                queue.cancel(job.job_id)
+                st.rerun()
+
 # PDF Functions
-def extract_pdf_text(pdf_files):
-    text = ""
+PASSAGE_WORDS = 200
+PASSAGE_OVERLAP = 40  # words shared by neighbouring windows
+QA_TOP_PASSAGES = 3
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "at",
+    "to", "for", "and", "or", "what", "which", "who", "whom", "when", "where",
+    "why", "how", "does", "do", "did", "it", "this", "that", "with", "by", "as",
+}
+
+def extract_pdf_pages(pdf_files):
+    """Extract text page by page, keeping the source file and page number."""
+    pages = []
     for pdf_file in pdf_files:
         try:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            for page_num, page in enumerate(pdf_reader.pages):
+                pages.append({
+                    "source": pdf_file.name,
+                    "page": page_num + 1,
+                    "text": page.extract_text() or "",
+                })
         except Exception as e:
             st.error(f"Error reading {pdf_file.name}: {e}")
-    return text
+    return pages
 
-def answer_pdf_question(question, pdf_text):
-    summarizer, tokenizer = load_summarizer()
-    if not summarizer:
-        return "Error: Could not load AI model."
+def normalize_words(text):
+    return [word.strip("?.,;:!\"'()") for word in text.lower().split()]
+
+def question_keywords(question):
+    return {word for word in normalize_words(question) if word and word not in STOPWORDS}
+
+def retrieve_passages(question, pdf_pages, top_k=QA_TOP_PASSAGES):
+    """Split pages into word windows and return the best keyword matches."""
+    keywords = question_keywords(question)
+    passages = []
+    for page in pdf_pages:
+        words = page["text"].split()
+        # Overlapping windows so answers spanning a boundary stay extractable
+        for start in range(0, len(words), PASSAGE_WORDS - PASSAGE_OVERLAP):
+            window = words[start:start + PASSAGE_WORDS]
+            counts = Counter(normalize_words(" ".join(window)))
+            score = sum(counts[word] for word in keywords)
+            passages.append({**page, "text": " ".join(window), "score": score})
+            if start + PASSAGE_WORDS >= len(words):
+                break
     
-    # Simple Q&A by combining question with relevant text chunks
-    if not pdf_text.strip():
+    # Stable sort keeps document order among equally scored passages
+    passages.sort(key=lambda passage: passage["score"], reverse=True)
+    return passages[:top_k]
+
+def answer_pdf_question_extractive(question, pdf_pages):
+    qa_model = load_qa_model()
+    if not qa_model:
+        raise RuntimeError("Could not load QA model.")
+    
+    passages = retrieve_passages(question, pdf_pages)
+    if not passages:
         return "No PDF text available. Please upload and process PDFs first."
     
+    # Only passages sharing a keyword with the question can hold the answer
+    passages = [passage for passage in passages if passage["score"] > 0]
+    if not passages:
+        return "No relevant passage found in the documents for this question."
+    
+    # Score answer spans over all passages in one batched forward pass
+    results = qa_model(
+        question=[question] * len(passages),
+        context=[passage["text"] for passage in passages],
+        batch_size=len(passages),
+    )
+    if isinstance(results, dict):
+        results = [results]
+    best_index = max(range(len(results)), key=lambda i: results[i]["score"])
+    best = passages[best_index]
+    answer = html.escape(results[best_index]["answer"].strip())
+    source = html.escape(best["source"])
+    return f"{answer} <em>(📄 {source}, page {best['page']})</em>"
+
+class StopOnEvent(StoppingCriteria):
+    """Stop generation once the event is set."""
+    
+    def __init__(self, event):
+        self.event = event
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.event.is_set()
+
+def answer_pdf_question_generative(question, pdf_text, tier=DEFAULT_TIER, on_token=None):
+    summarizer, tokenizer = load_summarizer()
+    if not summarizer:
+        raise RuntimeError("Could not load AI model.")
+    
     # Find relevant sections (simple keyword matching)
     question_words = question.lower().split()
     sentences = pdf_text.split('. ')
@@ -274,13 +533,176 @@ def answer_pdf_question(question, pdf_text):
     # Create a prompt for summarization
     prompt = f"Question: {question}\n\nContext: {context}\n\nAnswer:"
     
+    settings = GENERATION_TIERS[tier]
+    model = summarizer.model
+    # Truncate via chunk_text rather than truncation=True, which would change
+    # the shared fast tokenizer's settings while other threads use it
+    chunks = chunk_text(prompt, tokenizer, max_tokens=800)
+    inputs = tokenizer(chunks[0], return_tensors="pt")
+    
+    if on_token is None or settings["num_beams"] > 1:
+        output = model.generate(**inputs, **settings)
+        return tokenizer.decode(output[0], skip_special_tokens=True).strip()
+    
+    # Generate in a background thread and hand each decoded piece to on_token
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    stop_event = threading.Event()
+    errors = []
+    
+    def generate():
+        try:
+            model.generate(
+                **inputs,
+                **settings,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([StopOnEvent(stop_event)]),
+            )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+    
+    thread = threading.Thread(target=generate, daemon=True)
+    thread.start()
+    answer = ""
+    try:
+        for text in streamer:
+            answer += text
+            on_token(answer)
+    finally:
+        # A rerun can interrupt on_token mid-stream; stop generating and
+        # let the exception reach the answer cache so it releases the key
+        stop_event.set()
+    thread.join()
+    
+    if errors:
+        raise errors[0]
+    return answer.strip()
+
+def answer_pdf_question(question, pdf_text, pdf_pages, engine=ENGINE_EXTRACTIVE,
+                        tier=DEFAULT_TIER, on_token=None):
+    """Answer a question about the processed PDFs.
+    
+    on_token, if given, is called with the partial answer as the summarizer
+    streams it. Cached and extractive answers are returned whole.
+    """
+    if not pdf_text.strip():
+        return "No PDF text available. Please upload and process PDFs first."
+    
+    def generate():
+        if engine == ENGINE_EXTRACTIVE:
+            return answer_pdf_question_extractive(question, pdf_pages)
+        return answer_pdf_question_generative(question, pdf_text, tier, on_token)
+    
+    # Generation settings only affect the summarizer's answers
+    tier_key = None if engine == ENGINE_EXTRACTIVE else tier
+    key = (document_set_hash(pdf_pages), engine, tier_key, normalize_question(question))
     try:
-        chunks = chunk_text(prompt, tokenizer, max_tokens=800)
-        result = summarizer(chunks[0])
-        return result[0]['summary_text']
+        return get_answer_cache().get_or_compute(key, generate)
     except Exception as e:
         return f"Error generating answer: {e}"
 
+# Answer Cache
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 60 * 60  # seconds
+ANSWER_WAIT_TIMEOUT = 120  # seconds to wait on an identical in-flight question
+
+class AnswerInterrupted(Exception):
+    """The caller computing an answer was interrupted before finishing."""
+
+class AnswerCache:
+    """LRU cache of answers with a TTL, shared by all sessions.
+    
+    Concurrent requests for the same key wait on the first caller's
+    computation instead of running the model again.
+    """
+    
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (answer, stored_at)
+        self.in_flight = {}  # key -> Future
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get_or_compute(self, key, compute):
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry and time.monotonic() - entry[1] < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.entries.pop(key, None)
+                
+                future = self.in_flight.get(key)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self.in_flight[key] = future
+                    self.misses += 1
+            
+            if owner:
+                return self.compute_in_flight(key, future, compute)
+            
+            # Identical question already running; share its result
+            try:
+                answer = future.result(timeout=ANSWER_WAIT_TIMEOUT)
+            except AnswerInterrupted:
+                # The first caller's run was interrupted; retry and take over
+                continue
+            except FutureTimeoutError:
+                raise RuntimeError("Timed out waiting for the same question to be answered.")
+            with self.lock:
+                self.hits += 1
+            return answer
+    
+    def compute_in_flight(self, key, future, compute):
+        # Always release the key, even when Streamlit interrupts the run
+        # (RerunException/StopException derive from BaseException)
+        try:
+            answer = compute()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.set_exception(AnswerInterrupted())
+            raise
+        else:
+            with self.lock:
+                self.entries[key] = (answer, time.monotonic())
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+            future.set_result(answer)
+            return answer
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+    
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache()
+
+def document_set_hash(pdf_pages):
+    """Hash page text together with its source and page number, which citations use."""
+    digest = hashlib.sha256()
+    for page in pdf_pages:
+        for part in (page["source"], str(page["page"]), page["text"]):
+            digest.update(part.encode("utf-8", errors="ignore"))
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace.
+    
+    Question words are kept: "when" and "where" questions need different answers.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
 # Main App Layout
 tab1, tab2 = st.tabs(["📁 Code Directory Analyzer", "📚 PDF Document Chat"])
 
@@ -314,22 +736,29 @@ with tab1:
         """, unsafe_allow_html=True)
     
     if st.button("🔍 Analyze Code", type="primary", use_container_width=True):
-        summaries = []
+        targets = []
         
         if directory and os.path.isdir(directory):
-            with st.spinner("🔄 Analyzing files in directory..."):
-                summaries.append(summarize_files(directory))
+            targets.append((f"📂 {directory}", summarize_files, directory))
         
         if uploaded_files:
-            with st.spinner("🔄 Analyzing uploaded files..."):
-                summaries.append(summarize_uploaded_files(uploaded_files))
+            # Snapshot the uploads; the widget's file objects do not outlive the rerun
+            files = [(file.name, file.getvalue()) for file in uploaded_files]
+            targets.append((f"📎 {len(files)} uploaded file(s)", summarize_uploaded_files, files))
         
-        if summaries:
-            st.markdown("## 📊 Analysis Results")
-            for s in summaries:
-                st.markdown(s)
+        if targets:
+            summarizer, _ = load_summarizer()
+            if summarizer:
+                queue = get_analysis_queue()
+                for label, fn, source in targets:
+                    job_id = queue.submit(label, fn, source, summarizer)
+                    st.session_state.analysis_jobs.append(job_id)
+            else:
+                st.error("Error: Could not load AI model.")
         else:
             st.warning("⚠️ No valid files found or uploaded.")
+    
+    render_analysis_jobs()
 
 # Tab 2: PDF Chat
 with tab2:
@@ -350,7 +779,10 @@ with tab2:
         if st.button("🚀 Process PDFs", type="primary"):
             if pdf_files:
                 with st.spinner("📖 Extracting text from PDFs..."):
-                    st.session_state.pdf_text = extract_pdf_text(pdf_files)
+                    st.session_state.pdf_pages = extract_pdf_pages(pdf_files)
+                    st.session_state.pdf_text = "".join(
+                        page["text"] + "\n" for page in st.session_state.pdf_pages
+                    )
                     st.success(f"✅ Successfully processed {len(pdf_files)} PDF(s)!")
                     st.info(f"📊 Extracted {len(st.session_state.pdf_text)} characters of text")
             else:
@@ -372,27 +804,72 @@ with tab2:
         st.markdown("### 💬 Ask Questions About Your Documents")
         
         question = st.text_input("❓ Your question:", key="pdf_question")
+        engine = st.radio(
+            "⚙️ Answering engine:",
+            ANSWER_ENGINES,
+            horizontal=True,
+            key="answer_engine",
+            help="Extractive QA picks the answer span straight from the top matching passages and cites its page. The summarizer generates a free-form answer but is much slower."
+        )
+        
+        tier = st.select_slider(
+            "🎚️ Speed / quality:",
+            options=list(GENERATION_TIERS),
+            value=DEFAULT_TIER,
+            key="generation_tier",
+            disabled=engine == ENGINE_EXTRACTIVE,
+            help="Fast and Balanced decode greedily and stream the answer as it is generated. Quality uses beam search and shows the answer once complete."
+        )
         
         if st.button("🤖 Get Answer", type="secondary"):
             if question:
-                with st.spinner("🧠 Generating answer..."):
-                    answer = answer_pdf_question(question, st.session_state.pdf_text)
-                    
-                    # Add to chat history
-                    st.session_state.chat_history.append({"question": question, "answer": answer})
-                    
-                    # Display answer
-                    st.markdown(f"""
-                    <div class="chat-message user-message">
-                    <strong>🙋 You:</strong> {question}
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown(f"""
+                # Display question
+                st.markdown(f"""
+                <div class="chat-message user-message">
+                <strong>🙋 You:</strong> {question}
+                </div>
+                """, unsafe_allow_html=True)
+                
+                answer_placeholder = st.empty()
+                started = time.perf_counter()
+                first_token_at = []
+                
+                def render_partial(partial_answer):
+                    if not first_token_at:
+                        first_token_at.append(time.perf_counter())
+                    answer_placeholder.markdown(f"""
                     <div class="chat-message bot-message">
-                    <strong>🤖 AI:</strong> {answer}
+                    <strong>🤖 AI:</strong> {partial_answer}▌
                     </div>
                     """, unsafe_allow_html=True)
+                
+                with st.spinner("🧠 Generating answer..."):
+                    answer = answer_pdf_question(
+                        question,
+                        st.session_state.pdf_text,
+                        st.session_state.pdf_pages,
+                        engine,
+                        tier,
+                        on_token=render_partial,
+                    )
+                finished = time.perf_counter()
+                ttft = (first_token_at[0] if first_token_at else finished) - started
+                
+                # Add to chat history
+                st.session_state.chat_history.append({
+                    "question": question,
+                    "answer": answer,
+                    "ttft": ttft,
+                    "total_time": finished - started,
+                })
+                
+                # Display answer
+                answer_placeholder.markdown(f"""
+                <div class="chat-message bot-message">
+                <strong>🤖 AI:</strong> {answer}
+                </div>
+                """, unsafe_allow_html=True)
+                st.caption(f"⏱️ First token after {ttft:.2f}s · complete after {finished - started:.2f}s")
         
         # Display chat history
         if st.session_state.chat_history:
@@ -421,14 +898,33 @@ with st.sidebar:
     
     **🎯 Features:**
     - 📁 Code directory analysis
+    - ⏳ Background analysis jobs
     - 📚 PDF document chat
+    - ⚡ Extractive QA with page citations
+    - 🗃️ Cached answers for repeated questions
+    - 📝 Streaming answers
     - 🤖 Local AI processing
     - 💾 Chat history
     """)
     
+    answer_cache = get_answer_cache()
+    st.markdown("## ⚡ Answer Cache")
+    st.metric(
+        "Hit rate",
+        f"{answer_cache.hit_rate():.0%}",
+        help=f"{answer_cache.hits} hits / {answer_cache.misses} misses, {len(answer_cache.entries)} cached answers"
+    )
+    if st.session_state.chat_history:
+        last_chat = st.session_state.chat_history[-1]
+        st.metric("Last time to first token", f"{last_chat.get('ttft', 0):.2f}s")
+    
     if st.button("🔄 Clear All Data"):
+        for job_id in st.session_state.analysis_jobs:
+            get_analysis_queue().cancel(job_id)
+        st.session_state.analysis_jobs = []
         st.session_state.chat_history = []
         st.session_state.pdf_text = ""
+        st.session_state.pdf_pages = []
         st.success("✅ All data cleared!")
     
     st.markdown("---")